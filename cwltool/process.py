@@ -223,8 +223,16 @@ def get_schema(version):
     return SCHEMA_CACHE[version]
 
 
+@functools.lru_cache(maxsize=4096)
 def shortname(inputid):
     # type: (str) -> str
+    """Return the short name of a given parameter id, memoized.
+
+    The same ids are resolved over and over on the workflow scheduling
+    hot path, so cache the parsed results.  The cache is bounded because
+    anonymous ids carry uuids, so an unbounded cache grows for every
+    workflow run in a long-lived process.
+    """
     d = urllib.parse.urlparse(inputid)
     if d.fragment:
         return d.fragment.split("/")[-1]
@@ -1,11 +1,12 @@
 import copy
 import datetime
 import functools
+import itertools
 import logging
-import random
+import operator
 import tempfile
 import threading
-from collections import namedtuple
+from collections import ChainMap, deque, namedtuple
 from typing import (
     Any,
     Callable,
@@ -44,8 +45,59 @@ from .provenance import ProvenanceProfile
 from .stdfsaccess import StdFsAccess
 from .utils import DEFAULT_TMP_PREFIX, aslist
 
+_OK_STATUS = frozenset(("success", "skipped"))
+
 WorkflowStateItem = namedtuple("WorkflowStateItem", ["parameter", "value", "success"])
 
+ParameterPlan = namedtuple(
+    "ParameterPlan",
+    [
+        "parameter",
+        "iid",
+        "connections",
+        "link_merge",
+        "value_from",
+        "pick_value",
+        "has_default",
+        "default",
+    ],
+)
+
+
+def build_parameter_plan(parms, frag_only, sourceField):
+    # type: (List[Dict[str, Any]], bool, str) -> List[ParameterPlan]
+    """Precompute the per-parameter data that object_from_state needs.
+
+    The plan only depends on the parameter list, so callers on the
+    scheduling hot path build it once and reuse it on every pass.
+    """
+    plan = []
+    for inp in parms:
+        iid = inp["id"]
+        if frag_only:
+            iid = shortname(iid)
+        if sourceField in inp:
+            connections = aslist(inp[sourceField])  # type: Optional[List[str]]
+            link_merge = inp.get(
+                "linkMerge", ("merge_nested" if len(connections) > 1 else None)
+            )
+        else:
+            connections = None
+            link_merge = None
+        plan.append(
+            ParameterPlan(
+                inp,
+                iid,
+                connections,
+                link_merge,
+                inp.get("valueFrom"),
+                inp.get("pickValue"),
+                "default" in inp,
+                inp.get("default"),
+            )
+        )
+    return plan
+
 
 def default_make_tool(
     toolpath_object: MutableMapping[str, Any], loadingContext: LoadingContext
@@ -79,19 +131,65 @@ def findfiles(
 ) -> List[MutableMapping[str, Any]]:
     if fn is None:
         fn = []
-    if isinstance(wo, MutableMapping):
-        if wo.get("class") == "File":
-            fn.append(wo)
-            findfiles(wo.get("secondaryFiles", None), fn)
-        else:
-            for w in wo.values():
-                findfiles(w, fn)
-    elif isinstance(wo, MutableSequence):
-        for w in wo:
-            findfiles(w, fn)
+    # Iterate with an explicit work list instead of recursing, to avoid
+    # per-call overhead and recursion limits on deeply nested objects.
+    stack = deque([wo])
+    while stack:
+        item = stack.popleft()
+        if isinstance(item, MutableMapping):
+            if item.get("class") == "File":
+                fn.append(item)
+                stack.append(item.get("secondaryFiles", None))
+            else:
+                stack.extend(item.values())
+        elif isinstance(item, MutableSequence):
+            stack.extend(item)
     return fn
 
 
+_type_compat_cache = {}  # type: Dict[Tuple[str, str], bool]
+_TYPE_COMPAT_CACHE_MAX = 4096
+
+
+def _can_assign_src_to_sink_cached(srctype, sinktype):
+    # type: (Any, Any) -> bool
+    """Memoize checker.can_assign_src_to_sink on the serialized type pair.
+
+    The distinct types in a workflow are few and static while the
+    structural check runs once per link per scheduling pass, so a dict
+    lookup wins after the first call.
+    """
+    key = (json_dumps(srctype), json_dumps(sinktype))
+    result = _type_compat_cache.get(key)
+    if result is None:
+        result = can_assign_src_to_sink(srctype, sinktype)
+        if len(_type_compat_cache) >= _TYPE_COMPAT_CACHE_MAX:
+            # One workflow uses few distinct type pairs; reaching the
+            # bound means many workflows have passed through this
+            # process, so start fresh instead of growing forever.
+            _type_compat_cache.clear()
+        _type_compat_cache[key] = result
+    return result
+
+
+def _fast_clone(value):
+    # type: (Any) -> Any
+    """Copy a runtime value object without the copy-protocol overhead.
+
+    Values passed between steps are (nested) dicts and lists of
+    primitives, for which copy.deepcopy pays heavily in __reduce_ex__
+    dispatch.  Clone those directly and fall back to deepcopy for
+    anything else.
+    """
+    if isinstance(value, MutableMapping):
+        return {k: _fast_clone(v) for k, v in value.items()}
+    if isinstance(value, MutableSequence):
+        return [_fast_clone(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return copy.deepcopy(value)
+
+
 def match_types(
     sinktype,  # type: Union[List[str], str]
     src,  # type: WorkflowStateItem
@@ -99,70 +197,76 @@ def match_types(
     inputobj,  # type: Dict[str, Any]
     linkMerge,  # type: str
     valueFrom,  # type: Optional[str]
+):  # type: (...) -> bool
+    return _match_types(
+        sinktype, src.parameter["type"], src, iid, inputobj, linkMerge, valueFrom
+    )
+
+
+def _match_types(
+    sinktype,  # type: Union[List[str], str]
+    srctype,  # type: Union[List[str], str]
+    src,  # type: WorkflowStateItem
+    iid,  # type: str
+    inputobj,  # type: Dict[str, Any]
+    linkMerge,  # type: str
+    valueFrom,  # type: Optional[str]
 ):  # type: (...) -> bool
     if isinstance(sinktype, MutableSequence):
         # Sink is union type
         for st in sinktype:
-            if match_types(st, src, iid, inputobj, linkMerge, valueFrom):
+            if _match_types(st, srctype, src, iid, inputobj, linkMerge, valueFrom):
                 return True
-    elif isinstance(src.parameter["type"], MutableSequence):
+    elif isinstance(srctype, MutableSequence):
         # Source is union type
         # Check that at least one source type is compatible with the sink.
-        original_types = src.parameter["type"]
-        for source_type in original_types:
-            src.parameter["type"] = source_type
-            match = match_types(sinktype, src, iid, inputobj, linkMerge, valueFrom)
-            if match:
-                src.parameter["type"] = original_types
+        # The candidate type is passed down as an argument rather than
+        # written back into the (shared) parameter schema.
+        for source_type in srctype:
+            if _match_types(
+                sinktype, source_type, src, iid, inputobj, linkMerge, valueFrom
+            ):
                 return True
-        src.parameter["type"] = original_types
         return False
     elif linkMerge:
-        if iid not in inputobj:
-            inputobj[iid] = []
+        merged = inputobj.setdefault(iid, [])
         if linkMerge == "merge_nested":
-            inputobj[iid].append(src.value)
+            merged.append(src.value)
         elif linkMerge == "merge_flattened":
             if isinstance(src.value, MutableSequence):
-                inputobj[iid].extend(src.value)
+                merged.extend(src.value)
             else:
-                inputobj[iid].append(src.value)
+                merged.append(src.value)
         else:
             raise WorkflowException("Unrecognized linkMerge enum '%s'" % linkMerge)
         return True
     elif (
         valueFrom is not None
-        or can_assign_src_to_sink(src.parameter["type"], sinktype)
+        or _can_assign_src_to_sink_cached(srctype, sinktype)
         or sinktype == "Any"
     ):
         # simply assign the value from state to input
-        inputobj[iid] = copy.deepcopy(src.value)
+        inputobj[iid] = _fast_clone(src.value)
         return True
     return False
 
 
 def object_from_state(
     state,  # type: Dict[str, Optional[WorkflowStateItem]]
-    parms,  # type: List[Dict[str, Any]]
-    frag_only,  # type: bool
+    plan,  # type: List[ParameterPlan]
     supportsMultipleInput,  # type: bool
-    sourceField,  # type: str
     incomplete=False,  # type: bool
 ):  # type: (...) -> Optional[MutableMapping[str, Any]]
     inputobj = {}  # type: Dict[str, Any]
-    for inp in parms:
-        iid = inp["id"]
-        if frag_only:
-            iid = shortname(iid)
-        if sourceField in inp:
-            connections = aslist(inp[sourceField])
-            if len(connections) > 1 and not supportsMultipleInput:
-                raise WorkflowException(
-                    "Workflow contains multiple inbound links to a single "
-                    "parameter but MultipleInputFeatureRequirement is not "
-                    "declared."
-                )
-            for src in connections:
+    for entry in plan:
+        inp = entry.parameter
+        iid = entry.iid
+        if entry.connections is not None:
+            connections = entry.connections
+            if len(connections) == 1:
+                # Fast path for the overwhelmingly common single-source
+                # link: no feature check and no loop setup.
+                src = connections[0]
                 a_state = state.get(src, None)
                 if a_state is not None and (
                     a_state.success in ("success", "skipped") or incomplete
@@ -172,11 +276,8 @@ def object_from_state(
                         a_state,
                         iid,
                         inputobj,
-                        inp.get(
-                            "linkMerge",
-                            ("merge_nested" if len(connections) > 1 else None),
-                        ),
-                        valueFrom=inp.get("valueFrom"),
+                        entry.link_merge,
+                        valueFrom=entry.value_from,
                     ):
                         raise WorkflowException(
                             "Type mismatch between source '%s' (%s) and "
@@ -190,10 +291,47 @@ def object_from_state(
                     )
                 elif not incomplete:
                     return None
+            else:
+                if not supportsMultipleInput:
+                    raise WorkflowException(
+                        "Workflow contains multiple inbound links to a single "
+                        "parameter but MultipleInputFeatureRequirement is not "
+                        "declared."
+                    )
+                for src in connections:
+                    a_state = state.get(src, None)
+                    if a_state is not None and (
+                        a_state.success in ("success", "skipped") or incomplete
+                    ):
+                        if not match_types(
+                            inp["type"],
+                            a_state,
+                            iid,
+                            inputobj,
+                            entry.link_merge,
+                            valueFrom=entry.value_from,
+                        ):
+                            raise WorkflowException(
+                                "Type mismatch between source '%s' (%s) and "
+                                "sink '%s' (%s)"
+                                % (
+                                    src,
+                                    a_state.parameter["type"],
+                                    inp["id"],
+                                    inp["type"],
+                                )
+                            )
+                    elif src not in state:
+                        raise WorkflowException(
+                            "Connect source '%s' on parameter '%s' does not "
+                            "exist" % (src, inp["id"])
+                        )
+                    elif not incomplete:
+                        return None
 
-        if "pickValue" in inp and isinstance(inputobj.get(iid), MutableSequence):
-            seq = cast(MutableSequence[Any], inputobj.get(iid))
-            if inp["pickValue"] == "first_non_null":
+        seq = inputobj.get(iid) if entry.pick_value is not None else None
+        if isinstance(seq, MutableSequence):
+            if entry.pick_value == "first_non_null":
                 found = False
                 for v in seq:
                     if v is not None:
@@ -204,7 +342,7 @@ def object_from_state(
                     raise WorkflowException(
                         u"All sources for '%s' are null" % (shortname(inp["id"]))
                     )
-            elif inp["pickValue"] == "only_non_null":
+            elif entry.pick_value == "only_non_null":
                 found = False
                 for v in seq:
                     if v is not None:
@@ -219,13 +357,13 @@ def object_from_state(
                     raise WorkflowException(
                         u"All sources for '%s' are null" % (shortname(inp["id"]))
                     )
-            elif inp["pickValue"] == "all_non_null":
+            elif entry.pick_value == "all_non_null":
                 inputobj[iid] = [v for v in seq if v is not None]
 
-        if inputobj.get(iid) is None and "default" in inp:
-            inputobj[iid] = inp["default"]
+        if inputobj.get(iid) is None and entry.has_default:
+            inputobj[iid] = entry.default
 
-        if iid not in inputobj and ("valueFrom" in inp or incomplete):
+        if iid not in inputobj and (entry.value_from is not None or incomplete):
             inputobj[iid] = None
 
         if iid not in inputobj:
@@ -234,6 +372,25 @@ def object_from_state(
 
 
 class WorkflowJobStep(object):
+
+    __slots__ = (
+        "step",
+        "tool",
+        "id",
+        "submitted",
+        "completed",
+        "iterable",
+        "name",
+        "prov_obj",
+        "parent_wf",
+        "valueFrom",
+        "loadContents",
+        "literal_valueFrom",
+        "input_plan",
+        "_base_runtime_context",
+        "_runtime_context",
+    )
+
     def __init__(self, step):
         # type: (WorkflowStep) -> None
         """Initialize this WorkflowJobStep."""
@@ -248,25 +405,73 @@ class WorkflowJobStep(object):
         self.name = uniquename("step %s" % shortname(self.id))
         self.prov_obj = step.prov_obj
         self.parent_wf = step.parent_wf
+        # These are static per step, so compute them once here rather than
+        # on every try_make_job invocation.
+        self.valueFrom = {
+            i["id"]: i["valueFrom"] for i in self.tool["inputs"] if "valueFrom" in i
+        }
+        self.loadContents = frozenset(
+            i["id"] for i in self.tool["inputs"] if i.get("loadContents")
+        )
+        # Classify the valueFrom expressions once.  A literal (no "$(" or
+        # "${") evaluates to itself, so there is nothing to do at runtime.
+        self.literal_valueFrom = frozenset(
+            k for k, v in self.valueFrom.items() if "$(" not in v and "${" not in v
+        )
+        self.input_plan = build_parameter_plan(self.tool["inputs"], False, "source")
+        self._base_runtime_context = None  # type: Optional[RuntimeContext]
+        self._runtime_context = None  # type: Optional[RuntimeContext]
 
     def job(
         self,
         joborder,  # type: Mapping[str, str]
-        output_callback,  # type: functools.partial[None]
+        output_callback,  # type: Callable[..., Any]
         runtimeContext,  # type: RuntimeContext
     ):
         # type: (...) -> Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob], None, None]
-        runtimeContext = runtimeContext.copy()
-        runtimeContext.part_of = self.name
-        runtimeContext.name = shortname(self.id)
+        # The derived context only depends on the incoming one, and for a
+        # scatter step job() is called once per scatter element with the
+        # same incoming context.  RuntimeContext is treated as copy-on-write
+        # everywhere downstream, so make the copy once and reuse it.
+        if runtimeContext is not self._base_runtime_context:
+            self._base_runtime_context = runtimeContext
+            runtimeContext = runtimeContext.copy()
+            runtimeContext.part_of = self.name
+            runtimeContext.name = shortname(self.id)
+            self._runtime_context = runtimeContext
+        else:
+            runtimeContext = cast(RuntimeContext, self._runtime_context)
 
         _logger.info("[%s] start", self.name)
 
-        for j in self.step.job(joborder, output_callback, runtimeContext):
-            yield j
+        yield from self.step.job(joborder, output_callback, runtimeContext)
 
 
 class WorkflowJob(object):
+
+    # "builder" is not assigned here but SingleJobExecutor sets it on any
+    # yielded job when an outer builder is provided.
+    __slots__ = (
+        "workflow",
+        "prov_obj",
+        "parent_wf",
+        "tool",
+        "steps",
+        "state",
+        "processStatus",
+        "did_callback",
+        "made_progress",
+        "completed_count",
+        "supports_multiple_input",
+        "supports_step_input_expr",
+        "consumers",
+        "pending",
+        "output_plan",
+        "outdir",
+        "name",
+        "builder",
+    )
+
     def __init__(self, workflow, runtimeContext):
         # type: (Workflow, RuntimeContext) -> None
         """Initialize this WorkflowJob."""
@@ -282,6 +487,32 @@ class WorkflowJob(object):
         self.processStatus = ""
         self.did_callback = False
         self.made_progress = None  # type: Optional[bool]
+        self.completed_count = 0
+        # These requirements are fixed for the lifetime of the workflow, so
+        # look them up once instead of on every scheduling pass.
+        self.supports_multiple_input = bool(
+            workflow.get_requirement("MultipleInputFeatureRequirement")[0]
+        )
+        self.supports_step_input_expr = bool(
+            workflow.get_requirement("StepInputExpressionRequirement")[0]
+        )
+        # Map each state entry to the steps that consume it so that
+        # receive_output can requeue only the steps whose inputs changed,
+        # instead of the run loop re-attempting every unsubmitted step on
+        # every pass.
+        self.consumers = {}  # type: Dict[str, List[WorkflowJobStep]]
+        for wjstep in self.steps:
+            for inp in wjstep.tool["inputs"]:
+                if "source" in inp:
+                    for src in aslist(inp["source"]):
+                        self.consumers.setdefault(src, []).append(wjstep)
+        # Steps worth attempting on the next scheduling pass.  Seeded with
+        # every step; steps that turn out not to be ready are put back when
+        # one of their sources is populated.
+        self.pending = set(self.steps)
+        self.output_plan = build_parameter_plan(
+            self.tool["outputs"], True, "outputSource"
+        )
 
         if runtimeContext.outdir is not None:
             self.outdir = runtimeContext.outdir
@@ -308,18 +539,12 @@ class WorkflowJob(object):
     def do_output_callback(self, final_output_callback):
         # type: (Callable[[Any, Any], Any]) -> None
 
-        supportsMultipleInput = bool(
-            self.workflow.get_requirement("MultipleInputFeatureRequirement")[0]
-        )
-
         wo = None  # type: Optional[MutableMapping[str, str]]
         try:
             wo = object_from_state(
                 self.state,
-                self.tool["outputs"],
-                True,
-                supportsMultipleInput,
-                "outputSource",
+                self.output_plan,
+                self.supports_multiple_input,
                 incomplete=True,
             )
         except WorkflowException as err:
@@ -354,6 +579,13 @@ class WorkflowJob(object):
 
         final_output_callback(wo, self.processStatus)
 
+    def mark_completed(self, step):
+        # type: (WorkflowJobStep) -> None
+        """Record that a step has finished, keeping the completed count current."""
+        if not step.completed:
+            step.completed = True
+            self.completed_count += 1
+
     def receive_output(
         self, step, outputparms, final_output_callback, jobout, processStatus
     ):
@@ -365,6 +597,9 @@ class WorkflowJob(object):
                     self.state[i["id"]] = WorkflowStateItem(
                         i, jobout[i["id"]], processStatus
                     )
+                    for consumer in self.consumers.get(i["id"], []):
+                        if not consumer.submitted:
+                            self.pending.add(consumer)
                 else:
                     _logger.error(
                         "[%s] Output is missing expected field %s", step.name, i["id"]
@@ -383,14 +618,13 @@ class WorkflowJob(object):
         else:
             _logger.info("[%s] completed %s", step.name, processStatus)
 
-        step.completed = True
+        self.mark_completed(step)
         # Release the iterable related to this step to
         # reclaim memory.
         step.iterable = None
         self.made_progress = True
 
-        completed = sum(1 for s in self.steps if s.completed)
-        if completed == len(self.steps):
+        if self.completed_count == len(self.steps):
             self.do_output_callback(final_output_callback)
 
     def try_make_job(
@@ -403,16 +637,11 @@ class WorkflowJob(object):
         if step.submitted:
             return
 
-        inputparms = step.tool["inputs"]
         outputparms = step.tool["outputs"]
 
-        supportsMultipleInput = bool(
-            self.workflow.get_requirement("MultipleInputFeatureRequirement")[0]
-        )
-
         try:
             inputobj = object_from_state(
-                self.state, inputparms, False, supportsMultipleInput, "source"
+                self.state, step.input_plan, self.supports_multiple_input
             )
             if inputobj is None:
                 _logger.debug("[%s] job step %s not ready", self.name, step.id)
@@ -426,28 +655,33 @@ class WorkflowJob(object):
                 self.receive_output, step, outputparms, final_output_callback
             )
 
-            valueFrom = {
-                i["id"]: i["valueFrom"] for i in step.tool["inputs"] if "valueFrom" in i
-            }
+            valueFrom = step.valueFrom
+            loadContents = step.loadContents
 
-            loadContents = set(
-                i["id"] for i in step.tool["inputs"] if i.get("loadContents")
-            )
-
-            if len(valueFrom) > 0 and not bool(
-                self.workflow.get_requirement("StepInputExpressionRequirement")[0]
-            ):
+            if len(valueFrom) > 0 and not self.supports_step_input_expr:
                 raise WorkflowException(
                     "Workflow step contains valueFrom but StepInputExpressionRequirement not in requirements"
                 )
 
-            vfinputs = {shortname(k): v for k, v in inputobj.items()}
+            # Hoist everything that does not depend on the input object out
+            # of the closure; for scatter steps postScatterEval runs once
+            # per scatter element.
+            do_eval = functools.partial(
+                expression.do_eval,
+                requirements=self.workflow.requirements,
+                outdir=None,
+                tmpdir=None,
+                resources={},
+                debug=runtimeContext.debug,
+                js_console=runtimeContext.js_console,
+                timeout=runtimeContext.eval_timeout,
+            )
+            fs_access = getdefault(runtimeContext.make_fs_access, StdFsAccess)("")
 
             def postScatterEval(io):
                 # type: (MutableMapping[str, Any]) -> Optional[MutableMapping[str, Any]]
                 shortio = {shortname(k): v for k, v in io.items()}
 
-                fs_access = getdefault(runtimeContext.make_fs_access, StdFsAccess)("")
                 for k, v in io.items():
                     if k in loadContents and v.get("contents") is None:
                         with fs_access.open(v["location"], "rb") as f:
@@ -455,52 +689,34 @@ class WorkflowJob(object):
 
                 def valueFromFunc(k, v):  # type: (Any, Any) -> Any
                     if k in valueFrom:
+                        if k in step.literal_valueFrom:
+                            return valueFrom[k]
                         adjustDirObjs(
-                            v, functools.partial(get_listing, fs_access, recursive=True)
-                        )
-                        return expression.do_eval(
-                            valueFrom[k],
-                            shortio,
-                            self.workflow.requirements,
-                            None,
-                            None,
-                            {},
-                            context=v,
-                            debug=runtimeContext.debug,
-                            js_console=runtimeContext.js_console,
-                            timeout=runtimeContext.eval_timeout,
+                            v,
+                            functools.partial(get_listing, fs_access, recursive=True),
                         )
+                        return do_eval(valueFrom[k], shortio, context=v)
                     return v
 
                 psio = {k: valueFromFunc(k, v) for k, v in io.items()}
                 if "when" in step.tool:
                     evalinputs = {shortname(k): v for k, v in psio.items()}
-                    whenval = expression.do_eval(
-                        step.tool["when"],
-                        evalinputs,
-                        self.workflow.requirements,
-                        None,
-                        None,
-                        {},
-                        context=v,
-                        debug=runtimeContext.debug,
-                        js_console=runtimeContext.js_console,
-                        timeout=runtimeContext.eval_timeout,
-                    )
+                    whenval = do_eval(step.tool["when"], evalinputs, context=v)
                     if whenval is True:
                         pass
                     elif whenval is False:
-                        _logger.debug(
-                            "[%s] conditional %s evaluated to %s",
-                            step.name,
-                            step.tool["when"],
-                            whenval,
-                        )
-                        _logger.debug(
-                            "[%s] inputs was %s",
-                            step.name,
-                            json_dumps(evalinputs, indent=2),
-                        )
+                        if _logger.isEnabledFor(logging.DEBUG):
+                            _logger.debug(
+                                "[%s] conditional %s evaluated to %s",
+                                step.name,
+                                step.tool["when"],
+                                whenval,
+                            )
+                            _logger.debug(
+                                "[%s] inputs was %s",
+                                step.name,
+                                json_dumps(evalinputs, indent=2),
+                            )
                         return None
                     else:
                         raise WorkflowException(
@@ -557,19 +773,18 @@ class WorkflowJob(object):
                 else:
                     _logger.info(u"[%s] will be skipped", step.name)
                     callback({k["id"]: None for k in outputparms}, "skipped")
-                    step.completed = True
+                    self.mark_completed(step)
                     jobs = (_ for _ in ())
 
             step.submitted = True
 
-            for j in jobs:
-                yield j
+            yield from jobs
         except WorkflowException:
             raise
         except Exception:
             _logger.exception("Unhandled exception")
             self.processStatus = "permanentFail"
-            step.completed = True
+            self.mark_completed(step)
 
     def run(
         self,
@@ -620,8 +835,12 @@ class WorkflowJob(object):
             for out in step.tool["outputs"]:
                 self.state[out["id"]] = None
 
-        completed = 0
-        while completed < len(self.steps):
+        # This generator must stay single threaded: parallel dispatch of
+        # independently ready steps is the job of the executor (see
+        # MultithreadedJobExecutor), which drains this generator and runs the
+        # yielded jobs in worker threads, re-entering it via the output
+        # callbacks under runtimeContext.workflow_eval_lock.
+        while self.completed_count < len(self.steps):
             self.made_progress = False
 
             for step in self.steps:
@@ -631,7 +850,8 @@ class WorkflowJob(object):
                 ):
                     break
 
-                if not step.submitted:
+                if not step.submitted and step in self.pending:
+                    self.pending.discard(step)
                     try:
                         step.iterable = self.try_make_job(
                             step, output_callback, runtimeContext
@@ -659,9 +879,7 @@ class WorkflowJob(object):
                         _logger.debug("", exc_info=True)
                         self.processStatus = "permanentFail"
 
-            completed = sum(1 for s in self.steps if s.completed)
-
-            if not self.made_progress and completed < len(self.steps):
+            if not self.made_progress and self.completed_count < len(self.steps):
                 if self.processStatus != "success":
                     break
                 else:
@@ -726,22 +944,23 @@ class Workflow(Process):
                 "\n".join(str(v) for v in validation_errors)
             )
 
-        random.shuffle(self.steps)
+        self.steps = _topological_step_order(self.steps)
 
         # statically validate data links instead of doing it at runtime.
         workflow_inputs = self.tool["inputs"]
         workflow_outputs = self.tool["outputs"]
 
-        step_inputs = []  # type: List[Any]
-        step_outputs = []  # type: List[Any]
-        param_to_step = {}  # type: Dict[str, Dict[str, Any]]
-        for step in self.steps:
-            step_inputs.extend(step.tool["inputs"])
-            step_outputs.extend(step.tool["outputs"])
-            for s in step.tool["inputs"]:
-                param_to_step[s["id"]] = step.tool
-            for s in step.tool["outputs"]:
-                param_to_step[s["id"]] = step.tool
+        step_inputs = [
+            inp for step in self.steps for inp in step.tool["inputs"]
+        ]  # type: List[Any]
+        step_outputs = [
+            out for step in self.steps for out in step.tool["outputs"]
+        ]  # type: List[Any]
+        param_to_step = {
+            param["id"]: cast(Dict[str, Any], step.tool)
+            for step in self.steps
+            for param in itertools.chain(step.tool["inputs"], step.tool["outputs"])
+        }  # type: Dict[str, Dict[str, Any]]
 
         if getdefault(loadingContext.do_validate, True):
             static_checker(
@@ -782,24 +1001,78 @@ class Workflow(Process):
         runtimeContext.part_of = "workflow %s" % job.name
         runtimeContext.toplevel = False
 
-        for wjob in job.job(builder.job, output_callbacks, runtimeContext):
-            yield wjob
+        yield from job.job(builder.job, output_callbacks, runtimeContext)
 
     def visit(self, op: Callable[[MutableMapping[str, Any]], Any]) -> None:
-        op(self.tool)
-        for step in self.steps:
-            step.visit(op)
+        # Walk nested workflows with an explicit stack instead of
+        # recursing through every level of embedded tools.
+        stack = [cast(Process, self)]  # type: List[Process]
+        while stack:
+            proc = stack.pop()
+            if isinstance(proc, Workflow):
+                op(proc.tool)
+                # Reversed so steps are visited in declaration order.
+                stack.extend(step.embedded_tool for step in reversed(proc.steps))
+            else:
+                proc.visit(op)
+
+
+def _topological_step_order(steps):
+    # type: (List[WorkflowStep]) -> List[WorkflowStep]
+    """Order steps so that producers come before their consumers.
+
+    Runs Kahn's algorithm over the data links declared in the steps'
+    "source" fields.  Steps caught in a cycle are appended in their
+    original order.
+    """
+    producer = {}  # type: Dict[str, int]
+    for index, step in enumerate(steps):
+        for out in step.tool["outputs"]:
+            producer[out["id"]] = index
+
+    consumers = {}  # type: Dict[int, List[int]]
+    indegree = [0] * len(steps)
+    for index, step in enumerate(steps):
+        dependencies = set()
+        for inp in step.tool["inputs"]:
+            for src in aslist(inp.get("source", [])):
+                dep = producer.get(src)
+                if dep is not None and dep != index:
+                    dependencies.add(dep)
+        indegree[index] = len(dependencies)
+        for dep in dependencies:
+            consumers.setdefault(dep, []).append(index)
+
+    ready = deque(index for index, count in enumerate(indegree) if count == 0)
+    ordered = []  # type: List[int]
+    while ready:
+        index = ready.popleft()
+        ordered.append(index)
+        for consumer in consumers.get(index, []):
+            indegree[consumer] -= 1
+            if indegree[consumer] == 0:
+                ready.append(consumer)
+
+    if len(ordered) < len(steps):
+        ordered.extend(index for index, count in enumerate(indegree) if count > 0)
+    return [steps[index] for index in ordered]
+
+
+def _step_expression_text(step):
+    # type: (MutableMapping[str, Any]) -> str
+    """Concatenate a step's valueFrom and when expressions.
+
+    Whether an unbound input is referenced then reduces to one substring
+    test against this text, which callers compute once per step instead
+    of rescanning every expression per input.
+    """
+    parts = [st.get("valueFrom") or "" for st in step["in"]]
+    parts.append(cast(str, step.get("when", None)) or "")
+    return "\n".join(parts)
 
 
 def used_by_step(step: MutableMapping[str, Any], shortinputid: str) -> bool:
-    for st in step["in"]:
-        if st.get("valueFrom"):
-            if ("inputs.%s" % shortinputid) in st.get("valueFrom"):
-                return True
-    if step.get("when"):
-        if ("inputs.%s" % shortinputid) in cast(str, step.get("when")):
-            return True
-    return False
+    return ("inputs.%s" % shortinputid) in _step_expression_text(step)
 
 
 class WorkflowStep(Process):
@@ -818,10 +1091,10 @@ class WorkflowStep(Process):
 
         loadingContext = loadingContext.copy()
 
-        loadingContext.requirements = copy.deepcopy(
-            getdefault(loadingContext.requirements, [])
-        )
-        assert loadingContext.requirements is not None  # nosec
+        # Only the lists themselves are extended below, so fresh shallow
+        # lists are enough; deep-copying every requirement dict per step
+        # was a major startup cost on large workflows.
+        loadingContext.requirements = list(getdefault(loadingContext.requirements, []))
         loadingContext.requirements.extend(toolpath_object.get("requirements", []))
         loadingContext.requirements.extend(
             get_overrides(getdefault(loadingContext.overrides_list, []), self.id).get(
@@ -829,7 +1102,7 @@ class WorkflowStep(Process):
             )
         )
 
-        hints = copy.deepcopy(getdefault(loadingContext.hints, []))
+        hints = list(getdefault(loadingContext.hints, []))
         hints.extend(toolpath_object.get("hints", []))
         loadingContext.hints = hints
 
@@ -850,8 +1123,29 @@ class WorkflowStep(Process):
             ) from vexc
 
         validation_errors = []
-        self.tool = toolpath_object = copy.deepcopy(toolpath_object)
+        # The loops below only add new top-level fields ("inputs",
+        # "outputs", "id") and build their entries from copies, so a
+        # shallow top-level copy is sufficient instead of deep-copying the
+        # entire tool tree.
+        if isinstance(toolpath_object, CommentedMap):
+            commented_tool = CommentedMap(toolpath_object.items())
+            commented_tool.lc.data = copy.copy(toolpath_object.lc.data)
+            commented_tool.lc.filename = getattr(toolpath_object.lc, "filename", None)
+            tool = commented_tool  # type: MutableMapping[str, Any]
+        else:
+            tool = copy.copy(toolpath_object)
+        self.tool = toolpath_object = cast(Dict[str, Any], tool)
         bound = set()
+        # Index the embedded tool's parameters by short name once; the
+        # previous nested scan re-parsed every tool id for every step entry.
+        tool_index = {
+            toolfield: {
+                shortname(tool_entry["id"]): tool_entry
+                for tool_entry in self.embedded_tool.tool[toolfield]
+            }
+            for toolfield in ("inputs", "outputs")
+        }
+        step_expressions = None  # type: Optional[str]
         for stepfield, toolfield in (("in", "inputs"), ("out", "outputs")):
             toolpath_object[toolfield] = []
             for index, step_entry in enumerate(toolpath_object[stepfield]):
@@ -863,26 +1157,26 @@ class WorkflowStep(Process):
                     inputid = step_entry["id"]
 
                 shortinputid = shortname(inputid)
-                found = False
-                for tool_entry in self.embedded_tool.tool[toolfield]:
-                    frag = shortname(tool_entry["id"])
-                    if frag == shortinputid:
-                        # if the case that the step has a default for a parameter,
-                        # we do not want the default of the tool to override it
-                        step_default = None
-                        if "default" in param and "default" in tool_entry:
-                            step_default = param["default"]
-                        param.update(tool_entry)
-                        param["_tool_entry"] = tool_entry
-                        if step_default is not None:
-                            param["default"] = step_default
-                        found = True
-                        bound.add(frag)
-                        break
-                if not found:
+                tool_entry = tool_index[toolfield].get(shortinputid)
+                if tool_entry is not None:
+                    # if the case that the step has a default for a parameter,
+                    # we do not want the default of the tool to override it
+                    step_default = None
+                    if "default" in param and "default" in tool_entry:
+                        step_default = param["default"]
+                    param.update(tool_entry)
+                    param["_tool_entry"] = tool_entry
+                    if step_default is not None:
+                        param["default"] = step_default
+                    bound.add(shortinputid)
+                else:
                     if stepfield == "in":
                         param["type"] = "Any"
-                        param["used_by_step"] = used_by_step(self.tool, shortinputid)
+                        if step_expressions is None:
+                            step_expressions = _step_expression_text(self.tool)
+                        param["used_by_step"] = (
+                            "inputs.%s" % shortinputid
+                        ) in step_expressions
                         param["not_connected"] = True
                     else:
                         if isinstance(step_entry, Mapping):
@@ -915,11 +1209,13 @@ class WorkflowStep(Process):
                 param.lc.filename = toolpath_object[stepfield].lc.filename
                 toolpath_object[toolfield].append(param)
 
-        missing_values = []
-        for _, tool_entry in enumerate(self.embedded_tool.tool["inputs"]):
-            if shortname(tool_entry["id"]) not in bound:
-                if "null" not in tool_entry["type"] and "default" not in tool_entry:
-                    missing_values.append(shortname(tool_entry["id"]))
+        missing_values = [
+            shortinputid
+            for shortinputid, tool_entry in tool_index["inputs"].items()
+            if shortinputid not in bound
+            and "null" not in tool_entry["type"]
+            and "default" not in tool_entry
+        ]
 
         if missing_values:
             validation_errors.append(
@@ -937,7 +1233,10 @@ class WorkflowStep(Process):
 
         super(WorkflowStep, self).__init__(toolpath_object, loadingContext)
 
-        if self.embedded_tool.tool["class"] == "Workflow":
+        # Checked here and again on every job() call, so resolve it once.
+        self.embedded_is_workflow = self.embedded_tool.tool["class"] == "Workflow"
+
+        if self.embedded_is_workflow:
             (feature, _) = self.get_requirement("SubworkflowFeatureRequirement")
             if not feature:
                 raise WorkflowException(
@@ -953,8 +1252,18 @@ class WorkflowStep(Process):
                     "not in requirements"
                 )
 
-            inputparms = copy.deepcopy(self.tool["inputs"])
-            outputparms = copy.deepcopy(self.tool["outputs"])
+            # Only the top-level "type" field of each parameter is
+            # rewritten below (with a fresh dict), so per-entry shallow
+            # copies are enough; deep-copying recursed through every
+            # nested schema and default value.
+            inputparms = [
+                CommentedMap(p.items()) if isinstance(p, CommentedMap) else copy.copy(p)
+                for p in self.tool["inputs"]
+            ]
+            outputparms = [
+                CommentedMap(p.items()) if isinstance(p, CommentedMap) else copy.copy(p)
+                for p in self.tool["outputs"]
+            ]
             scatter = aslist(self.tool["scatter"])
 
             method = self.tool.get("scatterMethod")
@@ -965,7 +1274,8 @@ class WorkflowStep(Process):
 
             inp_map = {i["id"]: i for i in inputparms}
             for inp in scatter:
-                if inp not in inp_map:
+                entry = inp_map.get(inp)
+                if entry is None:
                     raise validate.ValidationException(
                         SourceLine(self.tool, "scatter").makeError(
                             "Scatter parameter '%s' does not correspond to "
@@ -977,26 +1287,37 @@ class WorkflowStep(Process):
                         )
                     )
 
-                inp_map[inp]["type"] = {"type": "array", "items": inp_map[inp]["type"]}
+                entry["type"] = {"type": "array", "items": entry["type"]}
 
             if self.tool.get("scatterMethod") == "nested_crossproduct":
                 nesting = len(scatter)
             else:
                 nesting = 1
 
-            for _ in range(0, nesting):
-                for oparam in outputparms:
-                    oparam["type"] = {"type": "array", "items": oparam["type"]}
+            for oparam in outputparms:
+                ptype = oparam["type"]
+                for _ in range(0, nesting):
+                    ptype = {"type": "array", "items": ptype}
+                oparam["type"] = ptype
             self.tool["inputs"] = inputparms
             self.tool["outputs"] = outputparms
         self.prov_obj = None  # type: Optional[ProvenanceProfile]
         if loadingContext.research_obj is not None:
             self.prov_obj = parentworkflowProv
-            if self.embedded_tool.tool["class"] == "Workflow":
+            if self.embedded_is_workflow:
                 self.parent_wf = self.embedded_tool.parent_wf
             else:
                 self.parent_wf = self.prov_obj
 
+        # job() rebuilds the step input object on every invocation, but
+        # which inputs are connected and their short names never change
+        # after construction.
+        self._connected_inputs = tuple(
+            (shortname(inp["id"]), inp["id"])
+            for inp in self.tool["inputs"]
+            if not inp.get("not_connected")
+        )
+
     def receive_output(self, output_callback, jobout, processStatus):
         # type: (Callable[...,Any], Dict[str, str], str) -> None
         output = {}
@@ -1017,7 +1338,7 @@ class WorkflowStep(Process):
         # initialize sub-workflow as a step in the parent profile
 
         if (
-            self.embedded_tool.tool["class"] == "Workflow"
+            self.embedded_is_workflow
             and runtimeContext.research_obj
             and self.prov_obj
             and self.embedded_tool.provenance_object
@@ -1030,19 +1351,16 @@ class WorkflowStep(Process):
                 self.embedded_tool.provenance_object.workflow_run_uri,
             )
 
-        step_input = {}
-        for inp in self.tool["inputs"]:
-            field = shortname(inp["id"])
-            if not inp.get("not_connected"):
-                step_input[field] = job_order[inp["id"]]
+        step_input = {
+            field: job_order[full_id] for field, full_id in self._connected_inputs
+        }
 
         try:
-            for tool in self.embedded_tool.job(
+            yield from self.embedded_tool.job(
                 step_input,
                 functools.partial(self.receive_output, output_callbacks),
                 runtimeContext,
-            ):
-                yield tool
+            )
         except WorkflowException:
             _logger.error("Exception on step '%s'", runtimeContext.name)
             raise
@@ -1058,7 +1376,7 @@ class ReceiveScatterOutput(object):
     def __init__(
         self,
         output_callback,  # type: Callable[..., Any]
-        dest,  # type: Dict[str, List[Optional[str]]]
+        dest,  # type: Dict[str, Dict[int, Optional[str]]]
         total,  # type: int
     ):  # type: (...) -> None
         """Initialize."""
@@ -1067,6 +1385,7 @@ class ReceiveScatterOutput(object):
         self.processStatus = "success"
         self.total = total
         self.output_callback = output_callback
+        self.delivered = False
         self.steps = (
             []
         )  # type: List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]]
@@ -1088,7 +1407,29 @@ class ReceiveScatterOutput(object):
         self.completed += 1
 
         if self.completed == self.total:
-            self.output_callback(self.dest, self.processStatus)
+            self._deliver()
+
+    def _deliver(self):
+        # type: () -> None
+        # When every element is skipped, completion is reached both while
+        # the steps are constructed and again in setTotal; deliver only
+        # once so the callback never sees the emptied dest.
+        if self.delivered:
+            return
+        self.delivered = True
+        self.output_callback(self._collect_dest(), self.processStatus)
+        # The collected values now live in the receiver's output object;
+        # drop our copy so a wide scatter's results can be reclaimed as
+        # soon as they are consumed.
+        self.dest = {}
+
+    def _collect_dest(self):
+        # type: () -> Dict[str, List[Optional[str]]]
+        """Materialize the sparse per-index slots as ordered output lists."""
+        return {
+            key: [slots.get(index) for index in range(self.total)]
+            for key, slots in self.dest.items()
+        }
 
     def setTotal(
         self,
@@ -1106,33 +1447,50 @@ class ReceiveScatterOutput(object):
         self.total = total
         self.steps = steps
         if self.completed == self.total:
-            self.output_callback(self.dest, self.processStatus)
+            self._deliver()
+
+
+class _ScatterCallback(object):
+    """Bind a scatter element index to its ReceiveScatterOutput.
+
+    Lighter than functools.partial for the one scatter callback shape we
+    need, since a wide scatter creates one of these per element.
+    """
+
+    __slots__ = ("rc", "index")
+
+    def __init__(self, rc, index):
+        # type: (ReceiveScatterOutput, int) -> None
+        """Initialize."""
+        self.rc = rc
+        self.index = index
+
+    def __call__(self, jobout, processStatus):
+        # type: (Dict[str, str], str) -> None
+        self.rc.receive_scatter_output(self.index, jobout, processStatus)
 
 
 def parallel_steps(steps, rc, runtimeContext):
     # type: (List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]], ReceiveScatterOutput, RuntimeContext) -> Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]
+    # on_error cannot change while a scatter is executing, so resolve it
+    # once instead of per yielded job.
+    stop_on_error = getdefault(runtimeContext.on_error, "stop") == "stop"
     while rc.completed < rc.total:
         made_progress = False
         for index, step in enumerate(steps):
-            if getdefault(
-                runtimeContext.on_error, "stop"
-            ) == "stop" and rc.processStatus not in ("success", "skipped"):
+            if stop_on_error and rc.processStatus not in _OK_STATUS:
                 break
             if step is None:
                 continue
             try:
                 for j in step:
-                    if getdefault(
-                        runtimeContext.on_error, "stop"
-                    ) == "stop" and rc.processStatus not in ("success", "skipped"):
+                    if stop_on_error and rc.processStatus not in _OK_STATUS:
                         break
                     if j is not None:
                         made_progress = True
                         yield j
                     else:
                         break
-                if made_progress:
-                    break
             except WorkflowException as exc:
                 _logger.error("Cannot make scatter job: %s", str(exc))
                 _logger.debug("", exc_info=True)
@@ -1160,24 +1518,28 @@ def dotproduct_scatter(
     if jobl is None:
         raise Exception("Impossible codepath")
 
-    output = {}  # type: Dict[str,List[Optional[str]]]
-    for i in process.tool["outputs"]:
-        output[i["id"]] = [None] * jobl
+    # Slots are filled lazily as results arrive; the ordered lists are
+    # only materialized when the scatter completes.
+    output = {
+        i["id"]: {} for i in process.tool["outputs"]
+    }  # type: Dict[str, Dict[int, Optional[str]]]
 
     rc = ReceiveScatterOutput(output_callback, output, jobl)
 
     steps = (
         []
     )  # type: List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]]
+    axes = [(key, joborder[key]) for key in scatter_keys]
     for index in range(0, jobl):
-        sjobo = copy.copy(joborder)  # type: Optional[MutableMapping[str, Any]]
+        # Overlay the scatter values on the shared job order instead of
+        # copying the whole mapping per element; downstream only reads it.
+        sjobo = ChainMap(
+            {key: values[index] for key, values in axes}, joborder
+        )  # type: Optional[MutableMapping[str, Any]]
         assert sjobo is not None  # nosec
-        for key in scatter_keys:
-            sjobo[key] = joborder[key][index]
-
         if runtimeContext.postScatterEval is not None:
             sjobo = runtimeContext.postScatterEval(sjobo)
-        curriedcallback = functools.partial(rc.receive_scatter_output, index)
+        curriedcallback = _ScatterCallback(rc, index)
         if sjobo is not None:
             steps.append(process.job(sjobo, curriedcallback, runtimeContext))
         else:
@@ -1197,11 +1559,28 @@ def nested_crossproduct_scatter(
 ) -> Generator[
     Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None
 ]:
-    scatter_key = scatter_keys[0]
+    # Share one scatter key tuple across the recursion and track the
+    # current axis with an index, instead of re-slicing the key list at
+    # every level.
+    return _nested_crossproduct_scatter(
+        process, joborder, tuple(scatter_keys), 0, output_callback, runtimeContext
+    )
+
+
+def _nested_crossproduct_scatter(
+    process,  # type: WorkflowJobStep
+    joborder,  # type: MutableMapping[str, Any]
+    scatter_keys,  # type: Tuple[str, ...]
+    depth,  # type: int
+    output_callback,  # type: Callable[..., Any]
+    runtimeContext,  # type: RuntimeContext
+):  # type: (...) -> Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]
+    """Inner loop."""
+    scatter_key = scatter_keys[depth]
     jobl = len(joborder[scatter_key])
-    output = {}  # type: Dict[str, List[Optional[str]]]
-    for i in process.tool["outputs"]:
-        output[i["id"]] = [None] * jobl
+    output = {
+        i["id"]: {} for i in process.tool["outputs"]
+    }  # type: Dict[str, Dict[int, Optional[str]]]
 
     rc = ReceiveScatterOutput(output_callback, output, jobl)
 
@@ -1209,14 +1588,14 @@ def nested_crossproduct_scatter(
         []
     )  # type: List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]]
     for index in range(0, jobl):
-        sjob = copy.copy(joborder)  # type: Optional[MutableMapping[str, Any]]
+        sjob = ChainMap(
+            {scatter_key: joborder[scatter_key][index]}, joborder
+        )  # type: Optional[MutableMapping[str, Any]]
         assert sjob is not None  # nosec
-        sjob[scatter_key] = joborder[scatter_key][index]
-
-        if len(scatter_keys) == 1:
+        if depth == len(scatter_keys) - 1:
             if runtimeContext.postScatterEval is not None:
                 sjob = runtimeContext.postScatterEval(sjob)
-            curriedcallback = functools.partial(rc.receive_scatter_output, index)
+            curriedcallback = _ScatterCallback(rc, index)
             if sjob is not None:
                 steps.append(process.job(sjob, curriedcallback, runtimeContext))
             else:
@@ -1224,11 +1603,12 @@ def nested_crossproduct_scatter(
                 steps.append(None)
         else:
             steps.append(
-                nested_crossproduct_scatter(
+                _nested_crossproduct_scatter(
                     process,
                     sjob,
-                    scatter_keys[1:],
-                    functools.partial(rc.receive_scatter_output, index),
+                    scatter_keys,
+                    depth + 1,
+                    _ScatterCallback(rc, index),
                     runtimeContext,
                 )
             )
@@ -1239,14 +1619,14 @@ def nested_crossproduct_scatter(
 
 def crossproduct_size(joborder, scatter_keys):
     # type: (MutableMapping[str, Any], MutableSequence[str]) -> int
-    scatter_key = scatter_keys[0]
-    if len(scatter_keys) == 1:
-        ssum = len(joborder[scatter_key])
-    else:
-        ssum = 0
-        for _ in range(0, len(joborder[scatter_key])):
-            ssum += crossproduct_size(joborder, scatter_keys[1:])
-    return ssum
+    """Compute the number of jobs a flat crossproduct scatter produces.
+
+    This is just the product of the scatter axis lengths; no need to
+    walk the whole job tree to count its leaves.
+    """
+    return functools.reduce(
+        operator.mul, (len(joborder[key]) for key in scatter_keys), 1
+    )
 
 
 def flat_crossproduct_scatter(
@@ -1258,12 +1638,12 @@ def flat_crossproduct_scatter(
 ) -> Generator[
     Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None
 ]:
-    output = {}  # type: Dict[str, List[Optional[str]]]
-    for i in process.tool["outputs"]:
-        output[i["id"]] = [None] * crossproduct_size(joborder, scatter_keys)
+    output = {
+        i["id"]: {} for i in process.tool["outputs"]
+    }  # type: Dict[str, Dict[int, Optional[str]]]
     callback = ReceiveScatterOutput(output_callback, output, 0)
     (steps, total) = _flat_crossproduct_scatter(
-        process, joborder, scatter_keys, callback, 0, runtimeContext
+        process, joborder, tuple(scatter_keys), 0, callback, 0, runtimeContext
     )
     callback.setTotal(total, steps)
     return parallel_steps(steps, callback, runtimeContext)
@@ -1272,27 +1652,28 @@ def flat_crossproduct_scatter(
 def _flat_crossproduct_scatter(
     process,  # type: WorkflowJobStep
     joborder,  # type: MutableMapping[str, Any]
-    scatter_keys,  # type: MutableSequence[str]
+    scatter_keys,  # type: Tuple[str, ...]
+    depth,  # type: int
     callback,  # type: ReceiveScatterOutput
     startindex,  # type: int
     runtimeContext,  # type: RuntimeContext
 ):  # type: (...) -> Tuple[List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]], int]
     """Inner loop."""
-    scatter_key = scatter_keys[0]
+    scatter_key = scatter_keys[depth]
     jobl = len(joborder[scatter_key])
     steps = (
         []
     )  # type: List[Optional[Generator[Union[ExpressionTool.ExpressionJob, JobBase, CallbackJob, None], None, None]]]
     put = startindex
     for index in range(0, jobl):
-        sjob = copy.copy(joborder)  # type: Optional[MutableMapping[str, Any]]
+        sjob = ChainMap(
+            {scatter_key: joborder[scatter_key][index]}, joborder
+        )  # type: Optional[MutableMapping[str, Any]]
         assert sjob is not None  # nosec
-        sjob[scatter_key] = joborder[scatter_key][index]
-
-        if len(scatter_keys) == 1:
+        if depth == len(scatter_keys) - 1:
             if runtimeContext.postScatterEval is not None:
                 sjob = runtimeContext.postScatterEval(sjob)
-            curriedcallback = functools.partial(callback.receive_scatter_output, put)
+            curriedcallback = _ScatterCallback(callback, put)
             if sjob is not None:
                 steps.append(process.job(sjob, curriedcallback, runtimeContext))
             else:
@@ -1301,7 +1682,7 @@ def _flat_crossproduct_scatter(
             put += 1
         else:
             (add, _) = _flat_crossproduct_scatter(
-                process, sjob, scatter_keys[1:], callback, put, runtimeContext
+                process, sjob, scatter_keys, depth + 1, callback, put, runtimeContext
             )
             put += len(add)
             steps.extend(add)
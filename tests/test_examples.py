@@ -224,6 +224,16 @@ def test_factory_partial_scatter():
     )
 
 
+def test_factory_all_skipped_scatter():
+    # When "when" skips every scatter element, the scatter completes
+    # during construction and again in setTotal; the workflow must still
+    # succeed with a null result per element.
+    factory = cwltool.factory.Factory()
+    all_skipped = factory.make(get_data("tests/wf/scatter_all_skipped.cwl"))
+
+    assert all_skipped() == {"out": [None, None, None]}
+
+
 def test_factory_partial_output():
     runtime_context = RuntimeContext()
     runtime_context.on_error = "continue"